@@ -0,0 +1,100 @@
+from token import lex
+from parser import parse
+from symbol_table import build_symtab
+from typecheck import typecheck
+from profile_report import read_profile
+from run import build
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+# Loop-heavy programs and the input they read.
+PROGRAMS = [
+    ("fib", """
+var a: int;
+var b: int;
+var n: int;
+var t: int;
+read n;
+a = 0;
+b = 1;
+while n do
+  t = a;
+  a = b;
+  b = b + t;
+  n = n - 1;
+done
+print a;
+""", "100000000"),
+    ("nested", """
+var i: int;
+var j: int;
+var s: int;
+var x: float;
+read i;
+s = 0;
+x = 0.0;
+while i do
+  j = 1000;
+  while j do
+    s = s + i * j - s / 7;
+    x = x + 0.5;
+    j = j - 1;
+  done
+  i = i - 1;
+done
+print s;
+print x;
+""", "100000"),
+]
+
+def time_run(exe, stdin, repeat=3):
+    """Return the best wall clock time of repeat runs of exe."""
+    best = None
+    for i in range(repeat):
+        start = time.time()
+        p = subprocess.Popen([exe], stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+        p.communicate(stdin.encode())
+        elapsed = time.time() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+def main():
+    """
+    python bench_pgo.py [gcc flags...]
+
+    For every program, build it without a profile, run a profiling
+    build to collect a profile, rebuild with the profile and compare
+    the run times of the two builds.
+    """
+    cflags = sys.argv[1:]
+    tmpdir = tempfile.mkdtemp()
+    try:
+        for name, src, stdin in PROGRAMS:
+            ast = parse(lex(src))
+            symtab = build_symtab(ast)
+            typed_ast = typecheck(ast, symtab)
+            base = os.path.join(tmpdir, name)
+
+            # Profiling build, run once with the same input.
+            build(typed_ast, symtab, base + "_prof", cflags=cflags, profile=True)
+            env = dict(os.environ, SEAL_PROFILE=base + ".prof")
+            p = subprocess.Popen([base + "_prof"], stdin=subprocess.PIPE,
+                                 stdout=subprocess.PIPE, env=env)
+            p.communicate(stdin.encode())
+            pgo = read_profile(base + ".prof")
+
+            build(typed_ast, symtab, base + "_plain", cflags=cflags)
+            build(typed_ast, symtab, base + "_pgo", pgo, cflags)
+            plain = time_run(base + "_plain", stdin)
+            tuned = time_run(base + "_pgo", stdin)
+            print("%-8s plain %8.3fs  pgo %8.3fs  x%.2f" % (name, plain, tuned, plain / tuned))
+    finally:
+        shutil.rmtree(tmpdir)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+from token import lex
+from parser import parse
+from symbol_table import build_symtab
+from typecheck import typecheck
+from serialize import dump_tokens, load_tokens, dump_ast, load_ast
+from bench_typecheck import BLOCK, DECLS
+import sys
+import time
+
+def timed(f, *args):
+    """Return the result of f(*args) and the best time of 3 calls."""
+    best = None
+    for i in range(3):
+        start = time.time()
+        result = f(*args)
+        elapsed = time.time() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return result, best
+
+def front_end(src):
+    ast = parse(lex(src))
+    return typecheck(ast, build_symtab(ast))
+
+def main():
+    """
+    python bench_serialize.py [blocks]
+
+    Compare loading tokens and typed ASTs from their binary encoding
+    with lexing, parsing and type checking the source again.
+    """
+    blocks = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    src = DECLS + BLOCK * blocks
+
+    toks, t_lex = timed(lex, src)
+    typed_ast, t_front = timed(front_end, src)
+    tok_data = dump_tokens(toks)
+    ast_data = dump_ast(typed_ast)
+    loaded_toks, t_load_toks = timed(load_tokens, tok_data)
+    loaded_ast, t_load_ast = timed(load_ast, ast_data)
+    if loaded_toks != toks or loaded_ast != typed_ast:
+        print("Error: round trip changed the data")
+        sys.exit(1)
+
+    print("%d tokens, %d bytes; typed AST %d bytes (repr %d bytes)"
+          % (len(toks), len(tok_data), len(ast_data), len(repr(typed_ast))))
+    print("lex                     %8.3fs" % t_lex)
+    print("load_tokens             %8.3fs  x%.1f" % (t_load_toks, t_lex / t_load_toks))
+    print("lex+parse+typecheck     %8.3fs" % t_front)
+    print("load_ast                %8.3fs  x%.1f" % (t_load_ast, t_front / t_load_ast))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+from token import lex
+from parser import parse
+from symbol_table import build_symtab
+from typecheck import typecheck, typecheck_parallel
+import copy
+import multiprocessing
+import pickle
+import sys
+import time
+
+# One block of statements, repeated to build a large program.
+BLOCK = """
+a = 0;
+b = 1;
+x = 1.5 * (y - 2.0);
+while n do
+  t = a;
+  a = b;
+  b = b + t;
+  n = n - 1;
+done
+print a;
+read n;
+"""
+
+DECLS = """
+var a: int;
+var b: int;
+var n: int;
+var t: int;
+var x: float;
+var y: float;
+"""
+
+def big_ast(n_stmts):
+    """
+    Build the AST of a program with about n_stmts top-level statements.
+    parse() pops tokens off the front of a list, so we parse the block
+    once and copy its statements instead of parsing a huge source.
+    """
+    ast = parse(lex(DECLS + BLOCK))
+    block = ast["stmts"]
+    stmts = []
+    while len(stmts) < n_stmts:
+        stmts.extend(copy.deepcopy(block))
+    return { "decls": ast["decls"], "stmts": stmts[:n_stmts] }
+
+def main():
+    n_stmts = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    ast = big_ast(n_stmts)
+    symtab = build_symtab(ast)
+
+    start = time.time()
+    typed_ast = typecheck(ast, symtab)
+    base = time.time() - start
+    print("%d statements, %d CPU(s)" % (n_stmts, multiprocessing.cpu_count()))
+    print("sequential   %8.3fs" % base)
+
+    # The parent unpickles every typed shard by itself, which bounds
+    # the speedup whatever the number of workers.
+    data = pickle.dumps(typed_ast, -1)
+    start = time.time()
+    pickle.loads(data)
+    print("unpickle     %8.3fs  (serial part, %d bytes)" % (time.time() - start, len(data)))
+
+    # force_procs, so that 1 worker also pays for the process and the pipe.
+    for jobs in (1, 2, 4, 8, 16):
+        start = time.time()
+        typecheck_parallel(ast, symtab, jobs, force_procs=True)
+        elapsed = time.time() - start
+        print("%2d worker(s) %8.3fs  x%.2f" % (jobs, elapsed, base / elapsed))
+
+if __name__ == "__main__":
+    main()
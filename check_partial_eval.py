@@ -0,0 +1,129 @@
+from token import lex
+from parser import parse
+from symbol_table import build_symtab
+from typecheck import typecheck
+from partial_eval import partial_eval
+from interp import run
+from run import build
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+try:
+    from StringIO import StringIO
+except ImportError:
+    from io import StringIO
+
+# Programs and the input they read.  partial_eval() must not change
+# what they print, whether they are compiled or interpreted.  A None
+# source means the .seal file of that name next to this script.
+PROGRAMS = [
+    ("demo", None, ""),
+    ("overflow", """
+var x: float;
+var n: int;
+x = 2.0;
+n = 200;
+while n do
+  x = x * 2.0;
+  n = n - 1;
+done
+print x;
+x = 300000000000000000000000000000000000000.0 * 10.0;
+print x;
+""", ""),
+    ("negzero", """
+var x: float;
+x = 0.0 * (0.0 - 1.0);
+print x;
+x = 0.0;
+print x;
+""", ""),
+    ("divzero", """
+var x: float;
+var y: float;
+var i: int;
+read y;
+x = 1.0 / y;
+print x;
+x = 0.0 / 0.0;
+print x;
+i = 7 / 2;
+print i;
+i = (0 - 7) / 2;
+print i;
+""", "0"),
+    ("mixed", """
+var i: int;
+var j: int;
+var s: int;
+var k: int;
+read k;
+s = 0;
+i = 10;
+while i do
+  j = 5;
+  while j do
+    s = s + i * j + k;
+    j = j - 1;
+  done
+  i = i - 1;
+done
+print s;
+j = 2147483647;
+j = j + 1;
+print j;
+""", "3"),
+]
+
+def compiled_output(typed_ast, symtab, exe, stdin):
+    build(typed_ast, symtab, exe)
+    p = subprocess.Popen([exe], stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+    return p.communicate(stdin.encode())[0].decode()
+
+def interp_output(typed_ast, symtab, stdin):
+    out = StringIO()
+    run(typed_ast, symtab, StringIO(stdin), out)
+    return out.getvalue()
+
+def main():
+    """
+    python check_partial_eval.py
+
+    Build every program with and without partial evaluation, with gcc
+    and with the interpreter, and check that the four outputs agree.
+    """
+    failed = 0
+    tmpdir = tempfile.mkdtemp()
+    try:
+        for name, src, stdin in PROGRAMS:
+            if src is None:
+                path = os.path.join(os.path.dirname(os.path.abspath(__file__)), name + ".seal")
+                with open(path) as f:
+                    src = f.read()
+            ast = parse(lex(src))
+            symtab = build_symtab(ast)
+            typed_ast = typecheck(ast, symtab)
+            folded, stats = partial_eval(typed_ast, symtab)
+            base = os.path.join(tmpdir, name)
+            outputs = [
+                compiled_output(typed_ast, symtab, base + "_plain", stdin),
+                compiled_output(folded, symtab, base + "_folded", stdin),
+                interp_output(typed_ast, symtab, stdin),
+                interp_output(folded, symtab, stdin),
+            ]
+            if all(out == outputs[0] for out in outputs):
+                print("ok      %-10s %d loops, %d statements eliminated"
+                      % (name, stats["loops"], stats["stmts"]))
+            else:
+                failed += 1
+                print("FAILED  %-10s gcc %r, gcc folded %r, interp %r, interp folded %r"
+                      % ((name,) + tuple(outputs)))
+    finally:
+        shutil.rmtree(tmpdir)
+    if failed:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
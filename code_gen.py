@@ -2,6 +2,9 @@ from token import lex
 from parser import parse
 from symbol_table import build_symtab
 from typecheck import typecheck
+from profile_report import read_profile
+from partial_eval import partial_eval
+from serialize import load_ast
 import sys
 
 # Token types
@@ -36,8 +39,24 @@ AST_BINOP  = 6
 AST_WHILE  = 7
 AST_READ   = 8
 
+# A loop is hot once it has done this many iterations in the profile.
+HOT_LOOP_ITERS = 1000
+# Copies of the body in an unrolled hot loop.
+UNROLL = 4
+
+def error(msg):
+    print("Error: " + msg)
+    sys.exit(1)
+
+def option_value(option):
+    """Return the argument following option on the command line."""
+    i = sys.argv.index(option)
+    if i + 1 >= len(sys.argv):
+        error("%s needs a file name" % option)
+    return sys.argv[i + 1]
+
 curr_tmp = 0
-def codegen(ast, symtab):
+def codegen(ast, symtab, profile=False, timing=False, pgo=None):
     """
     Input : the AST and symbol table of a mini program
     Output: an equivalent C program
@@ -56,6 +75,21 @@ def codegen(ast, symtab):
 
     A typical code generator would return a structure that could then
     be manipulated for analysis and optimization.
+
+    With profile=True, the C program also counts how many times every
+    statement runs, and how many times every while loop is entered and
+    iterates, and
+    with timing=True how much processor time every loop takes.  The
+    counters are keyed by source line and written at exit to the file
+    named by $SEAL_PROFILE, or seal.prof; profile_report.py maps them
+    back onto the source.
+
+    pgo is a profile as returned by profile_report.read_profile().  When
+    it is given, loops that did at least HOT_LOOP_ITERS iterations are
+    treated as hot: their condition is marked as likely true with
+    __builtin_expect, the body of innermost ones is unrolled UNROLL times
+    if they usually run that long, and the variables they use are declared
+    register, unless they are read (scanf needs their address).
     """
     def new_temp():
         """Return a new, unique temporary variable name."""
@@ -64,9 +98,90 @@ def codegen(ast, symtab):
         return "t_" + str(curr_tmp)
 
     def gen_decl(decl):
-        print("%s %s;" % (decl["type"], decl["id"]))
+        if decl["id"] in hot_vars:
+            print("register %s %s;" % (decl["type"], decl["id"]))
+        else:
+            print("%s %s;" % (decl["type"], decl["id"]))
+
+    def loop_profile(stmt):
+        """Return how many times a loop was entered and iterated."""
+        if pgo is None:
+            return 0, 0
+        entries, iters, secs = pgo[1].get(stmt["line"], (0, 0, 0.0))
+        return entries, iters
+
+    def is_hot(stmt):
+        return loop_profile(stmt)[1] >= HOT_LOOP_ITERS
+
+    def find_hot_vars(stmts, hot, used, read):
+        def expr_vars(expr):
+            if expr["nodetype"] == AST_ID:
+                used.add(expr["name"])
+            elif expr["nodetype"] == AST_BINOP:
+                expr_vars(expr["lhs"])
+                expr_vars(expr["rhs"])
+        for stmt in stmts:
+            if stmt["nodetype"] == AST_READ:
+                read.add(stmt["id"]["value"])
+            elif stmt["nodetype"] == AST_WHILE:
+                body_hot = hot or is_hot(stmt)
+                if body_hot:
+                    expr_vars(stmt["expr"])
+                find_hot_vars(stmt["body"], body_hot, used, read)
+            elif not hot:
+                pass
+            elif stmt["nodetype"] == AST_ASSIGN:
+                used.add(stmt["lhs"])
+                expr_vars(stmt["rhs"])
+            elif stmt["nodetype"] == AST_PRINT:
+                expr_vars(stmt["expr"])
+        return used - read
+
+    hot_vars = set()
+    if pgo is not None:
+        hot_vars = find_hot_vars(ast["stmts"], False, set(), set())
+
+    # Number the statements and loops in the order they are generated;
+    # the counter arrays are indexed by these numbers.
+    stmt_ids = {}
+    stmt_lines = []
+    loop_ids = {}
+    loop_lines = []
+    def number_stmts(stmts):
+        for stmt in stmts:
+            stmt_ids[id(stmt)] = len(stmt_lines)
+            stmt_lines.append(stmt["line"])
+            if stmt["nodetype"] == AST_WHILE:
+                loop_ids[id(stmt)] = len(loop_lines)
+                loop_lines.append(stmt["line"])
+                number_stmts(stmt["body"])
+
+    def gen_profile_decls():
+        print("#include <stdlib.h>")
+        if timing:
+            print("#include <time.h>")
+        # Zero-length arrays are not valid C, so keep at least one slot.
+        print("static unsigned long seal_stmt_count[%d];" % max(len(stmt_lines), 1))
+        print("static const int seal_stmt_line[] = {%s};" % (", ".join(map(str, stmt_lines)) or "0"))
+        print("static unsigned long seal_loop_entries[%d];" % max(len(loop_lines), 1))
+        print("static unsigned long seal_loop_iters[%d];" % max(len(loop_lines), 1))
+        print("static double seal_loop_secs[%d];" % max(len(loop_lines), 1))
+        print("static const int seal_loop_line[] = {%s};" % (", ".join(map(str, loop_lines)) or "0"))
+        print("static void seal_dump_profile(void) {")
+        print('const char *path = getenv("SEAL_PROFILE");')
+        print('FILE *f = fopen(path ? path : "seal.prof", "w");')
+        print("int i;")
+        print("if (!f) return;")
+        print("for (i = 0; i < %d; i++)" % len(stmt_lines))
+        print('fprintf(f, "stmt %d %lu\\n", seal_stmt_line[i], seal_stmt_count[i]);')
+        print("for (i = 0; i < %d; i++)" % len(loop_lines))
+        print('fprintf(f, "loop %d %lu %lu %f\\n", seal_loop_line[i], seal_loop_entries[i], seal_loop_iters[i], seal_loop_secs[i]);')
+        print("fclose(f);")
+        print("}")
 
     def gen_stmt(stmt):
+        if profile:
+            print("seal_stmt_count[%d]++;" % stmt_ids[id(stmt)])
         if stmt["nodetype"] == AST_ASSIGN:
             if stmt["lhs"] not in symtab:
                 error("undeclared variable: %s" % stmt["lhs"])
@@ -80,23 +195,46 @@ def codegen(ast, symtab):
                 flag = "f"
             print('printf("%%%s\\n", %s);' % (flag, expr_loc))
         elif stmt["nodetype"] == AST_READ:
-            id = stmt["id"]["value"]
-            if symtab[id] == "int":
+            name = stmt["id"]["value"]
+            if symtab[name] == "int":
                 flag = "d"
             else:
                 flag = "f"
-            print('scanf("%%%s", &%s);' % (flag, id))
+            print('scanf("%%%s", &%s);' % (flag, name))
         elif stmt["nodetype"] == AST_WHILE:
+            if profile and timing:
+                print("{ clock_t seal_start = clock();")
+            if profile:
+                print("seal_loop_entries[%d]++;" % loop_ids[id(stmt)])
+            entries, iters = loop_profile(stmt)
+            copies = 1
             expr_loc = gen_expr(stmt["expr"])
-            print("while (%s) { " % expr_loc)
-            for body_stmt in stmt["body"]:
-                gen_stmt(body_stmt)
+            if is_hot(stmt) and iters > entries:
+                print("while (__builtin_expect(!!(%s), 1)) { " % expr_loc)
+                innermost = all(body_stmt["nodetype"] != AST_WHILE for body_stmt in stmt["body"])
+                if innermost and iters >= UNROLL * entries:
+                    copies = UNROLL
+            else:
+                print("while (%s) { " % expr_loc)
+            for copy in range(copies):
+                if copy > 0:
+                    gen_expr(stmt["expr"], expr_loc)
+                    print("if (!%s) break;" % expr_loc)
+                if profile:
+                    print("seal_loop_iters[%d]++;" % loop_ids[id(stmt)])
+                for body_stmt in stmt["body"]:
+                    gen_stmt(body_stmt)
             gen_expr(stmt["expr"], expr_loc)
             print("}")
+            if profile and timing:
+                print("seal_loop_secs[%d] += (double)(clock() - seal_start) / CLOCKS_PER_SEC; }" % loop_ids[id(stmt)])
 
     def gen_expr(expr, loc_name=None):
         if expr["nodetype"] in (AST_INT, AST_FLOAT):
-            loc = loc_name or new_temp()
+            if loc_name:
+                print("%s = %s;" % (loc_name, expr["value"]))
+                return loc_name
+            loc = new_temp()
             print("%s %s = %s;" % (expr["type"], loc, expr["value"]))
             return loc
         elif expr["nodetype"] == AST_ID:
@@ -104,13 +242,21 @@ def codegen(ast, symtab):
         elif expr["nodetype"] == AST_BINOP:
             lhs_loc = gen_expr(expr["lhs"])
             rhs_loc = gen_expr(expr["rhs"])
+            if loc_name:
+                print("%s = %s %s %s;" % (loc_name, lhs_loc, expr["op"], rhs_loc))
+                return loc_name
             loc = new_temp()
             print("%s %s = %s %s %s;" % (expr["type"], loc, lhs_loc, expr["op"], rhs_loc))
             return loc
 
     # Add the usual C headers and main declaration.
     print("#include <stdio.h>")
+    if profile:
+        number_stmts(ast["stmts"])
+        gen_profile_decls()
     print("int main(void) {")
+    if profile:
+        print("atexit(seal_dump_profile);")
 
     # Add the variable declarations at the beginning of main.
     for decl in ast["decls"]:
@@ -123,12 +269,27 @@ def codegen(ast, symtab):
     print("}")
 
 def main():
-    src = sys.stdin.read()
-    toks = lex(src)                      # source -> tokens
-    ast = parse(toks)                    # tokens -> AST
-    symtab = build_symtab(ast)           # AST -> symbol table
-    typed_ast = typecheck(ast, symtab)   # AST * symbol table -> Typed AST
-    codegen(typed_ast, symtab)  # Typed AST * symbol table -> C code
+    if "--from-ast" in sys.argv:
+        # Typed AST saved by serialize.py, no need to lex and parse again.
+        with open(option_value("--from-ast"), "rb") as f:
+            typed_ast = load_ast(f.read(), typed=True)
+        symtab = build_symtab(typed_ast)
+    else:
+        src = sys.stdin.read()
+        toks = lex(src)                      # source -> tokens
+        ast = parse(toks)                    # tokens -> AST
+        symtab = build_symtab(ast)           # AST -> symbol table
+        typed_ast = typecheck(ast, symtab)   # AST * symbol table -> Typed AST
+    if "--partial-eval" in sys.argv:
+        typed_ast, stats = partial_eval(typed_ast, symtab)
+        sys.stderr.write("partial eval: %d loops and %d statements eliminated\n"
+                         % (stats["loops"], stats["stmts"]))
+    timing = "--profile-timing" in sys.argv
+    profile = timing or "--profile" in sys.argv
+    pgo = None
+    if "--use-profile" in sys.argv:
+        pgo = read_profile(option_value("--use-profile"))
+    codegen(typed_ast, symtab, profile, timing, pgo)  # Typed AST * symbol table -> C code
 
 
 if __name__ == "__main__":
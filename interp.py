@@ -0,0 +1,142 @@
+from token import lex
+from parser import parse
+from symbol_table import build_symtab
+from typecheck import typecheck
+import math
+import struct
+import sys
+
+# AST nodes
+AST_DECL   = 0
+AST_ASSIGN = 1
+AST_PRINT  = 2
+AST_INT    = 3
+AST_FLOAT  = 4
+AST_ID     = 5
+AST_BINOP  = 6
+AST_WHILE  = 7
+AST_READ   = 8
+
+def error(msg):
+    print("Error: " + msg)
+    sys.exit(1)
+
+def c_int(v):
+    """Wrap v to a 32-bit C int."""
+    return (v + 2**31) % 2**32 - 2**31
+
+def c_float(v):
+    """Round v to a C float, overflowing to infinity like C does."""
+    try:
+        return struct.unpack("f", struct.pack("f", v))[0]
+    except OverflowError:
+        return math.copysign(float("inf"), v)
+
+def binop(op, ty, a, b):
+    """
+    Apply op to a and b the way the generated C does: ints wrap around
+    and their division truncates towards zero, floats are single
+    precision and follow IEEE rules, so a float division by zero gives
+    an infinity or a NaN rather than an error.
+    """
+    if op == "+":
+        v = a + b
+    elif op == "-":
+        v = a - b
+    elif op == "*":
+        v = a * b
+    elif b == 0 and ty == "int":
+        error("division by zero")
+    elif b == 0:
+        if a == 0 or math.isnan(a):
+            # inf * 0 gives the NaN the hardware gives for 0 / 0.
+            v = float("inf") * 0.0
+        else:
+            v = math.copysign(float("inf"), a) * math.copysign(1.0, b)
+    elif ty == "int":
+        v = abs(a) // abs(b)
+        if (a < 0) != (b < 0):
+            v = -v
+    else:
+        v = a / b
+    if ty == "int":
+        return c_int(v)
+    return c_float(v)
+
+def eval_expr(expr, env):
+    if expr["nodetype"] == AST_INT:
+        return expr["value"]
+    elif expr["nodetype"] == AST_FLOAT:
+        return c_float(expr["value"])
+    elif expr["nodetype"] == AST_ID:
+        return env[expr["name"]]
+    elif expr["nodetype"] == AST_BINOP:
+        a = eval_expr(expr["lhs"], env)
+        b = eval_expr(expr["rhs"], env)
+        return binop(expr["op"], expr["type"], a, b)
+
+def read_words(f):
+    """Yield the whitespace separated words of f, like scanf does."""
+    for row in f:
+        for word in row.split():
+            yield word
+
+def run(ast, symtab, infile=None, outfile=None):
+    """
+    Input : the typed AST and symbol table of a mini program
+    Output: none, the program is run in-process
+
+    run() executes the typed AST directly, without going through C.
+    It is meant for programs that finish quickly, where starting gcc
+    would cost more than the program itself.  Variables start at 0.
+    """
+    infile = infile or sys.stdin
+    outfile = outfile or sys.stdout
+    words = read_words(infile)
+    env = {}
+    for name, ty in symtab.items():
+        env[name] = 0 if ty == "int" else 0.0
+
+    def exec_stmt(stmt):
+        if stmt["nodetype"] == AST_ASSIGN:
+            env[stmt["lhs"]] = eval_expr(stmt["rhs"], env)
+        elif stmt["nodetype"] == AST_PRINT:
+            v = eval_expr(stmt["expr"], env)
+            if stmt["expr"]["type"] == "int":
+                outfile.write("%d\n" % v)
+            elif math.isnan(v) and math.copysign(1.0, v) < 0:
+                # printf shows the sign of a NaN, Python does not.
+                outfile.write("-nan\n")
+            else:
+                outfile.write("%f\n" % v)
+        elif stmt["nodetype"] == AST_READ:
+            name = stmt["id"]["value"]
+            word = next(words, None)
+            if word is None:
+                error("no input for %s" % name)
+            try:
+                if symtab[name] == "int":
+                    env[name] = c_int(int(word))
+                else:
+                    env[name] = c_float(float(word))
+            except ValueError:
+                error("bad input for %s: %s" % (name, word))
+        elif stmt["nodetype"] == AST_WHILE:
+            while eval_expr(stmt["expr"], env):
+                for body_stmt in stmt["body"]:
+                    exec_stmt(body_stmt)
+
+    for stmt in ast["stmts"]:
+        exec_stmt(stmt)
+
+def main():
+    if len(sys.argv) < 2:
+        error("usage: interp.py prog.seal")
+    with open(sys.argv[1]) as f:
+        src = f.read()
+    ast = parse(lex(src))
+    symtab = build_symtab(ast)
+    run(typecheck(ast, symtab), symtab)
+
+if __name__ == "__main__":
+    main()
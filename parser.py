@@ -78,29 +78,30 @@ def parse(toks):
 
     def stmt():
         next_tok = peek()
+        line = toks[0]["line"]
         if next_tok == TOK_ID:
             id = consume(TOK_ID)
             consume(TOK_EQ)
             e = expr()
             consume(TOK_SEMI)
-            return astnode(AST_ASSIGN, lhs=id["value"], rhs=e)
+            return astnode(AST_ASSIGN, lhs=id["value"], rhs=e, line=line)
         elif next_tok == TOK_PRINT:
             consume(TOK_PRINT)
             e = expr()
             consume(TOK_SEMI)
-            return astnode(AST_PRINT, expr=e)
+            return astnode(AST_PRINT, expr=e, line=line)
         elif next_tok == TOK_READ:
             consume(TOK_READ)
             id = consume(TOK_ID)
             consume(TOK_SEMI)
-            return astnode(AST_READ, id=id)
+            return astnode(AST_READ, id=id, line=line)
         elif next_tok == TOK_WHILE:
             consume(TOK_WHILE)
             e = expr()
             consume(TOK_DO)
             body = stmts()
             consume(TOK_DONE)
-            return astnode(AST_WHILE, expr=e, body=body)
+            return astnode(AST_WHILE, expr=e, body=body, line=line)
         else:
             error("illegal statement")
 
@@ -0,0 +1,211 @@
+from token import lex
+from parser import parse
+from symbol_table import build_symtab
+from typecheck import typecheck
+from interp import binop, c_float
+import math
+import sys
+
+# AST nodes
+AST_DECL   = 0
+AST_ASSIGN = 1
+AST_PRINT  = 2
+AST_INT    = 3
+AST_FLOAT  = 4
+AST_ID     = 5
+AST_BINOP  = 6
+AST_WHILE  = 7
+AST_READ   = 8
+
+# Loop iterations we are willing to run at compile time, per loop.
+BUDGET = 100000
+
+class NotStatic(Exception):
+    pass
+
+def astnode(nodetype, **args):
+    return dict(nodetype=nodetype, **args)
+
+def literal(value, ty):
+    if ty == "int":
+        return astnode(AST_INT, value=value, type="int")
+    return astnode(AST_FLOAT, value=value, type="float")
+
+def count_stmts(stmts):
+    """Return the number of statements and of while loops in stmts."""
+    n_stmts = 0
+    n_loops = 0
+    for stmt in stmts:
+        n_stmts += 1
+        if stmt["nodetype"] == AST_WHILE:
+            body_stmts, body_loops = count_stmts(stmt["body"])
+            n_stmts += body_stmts
+            n_loops += body_loops + 1
+    return n_stmts, n_loops
+
+def assigned_vars(stmts, names):
+    """Add to names every variable assigned or read in stmts."""
+    for stmt in stmts:
+        if stmt["nodetype"] == AST_ASSIGN:
+            names.add(stmt["lhs"])
+        elif stmt["nodetype"] == AST_READ:
+            names.add(stmt["id"]["value"])
+        elif stmt["nodetype"] == AST_WHILE:
+            assigned_vars(stmt["body"], names)
+    return names
+
+def has_io(stmts):
+    for stmt in stmts:
+        if stmt["nodetype"] in (AST_PRINT, AST_READ):
+            return True
+        if stmt["nodetype"] == AST_WHILE and has_io(stmt["body"]):
+            return True
+    return False
+
+def finite(v):
+    """Return v, or None for an infinity or a NaN, which C cannot spell."""
+    if isinstance(v, float) and (math.isinf(v) or math.isnan(v)):
+        return None
+    return v
+
+def fold(expr, env):
+    """
+    Return the value of expr if every variable it uses has a known
+    value in env, None otherwise.  env maps variables to (value, line),
+    where line is the source line that gave the variable its value.  A division by zero, an infinity or a
+    NaN are left for the program to compute at run time.
+    """
+    if expr["nodetype"] == AST_INT:
+        return expr["value"]
+    elif expr["nodetype"] == AST_FLOAT:
+        return finite(c_float(expr["value"]))
+    elif expr["nodetype"] == AST_ID:
+        if expr["name"] in env:
+            return env[expr["name"]][0]
+        return None
+    elif expr["nodetype"] == AST_BINOP:
+        a = fold(expr["lhs"], env)
+        b = fold(expr["rhs"], env)
+        if a is None or b is None or (expr["op"] == "/" and b == 0):
+            return None
+        return finite(binop(expr["op"], expr["type"], a, b))
+
+def subst(expr, env):
+    """Replace the parts of expr whose value is known by literals."""
+    v = fold(expr, env)
+    if v is not None:
+        return literal(v, expr["type"])
+    if expr["nodetype"] == AST_BINOP:
+        return astnode(AST_BINOP, op=expr["op"], lhs=subst(expr["lhs"], env),
+                       rhs=subst(expr["rhs"], env), type=expr["type"])
+    return expr
+
+def run_loop(stmt, env, steps, line):
+    """
+    Execute a while loop whose variables all have known values in env,
+    updating env; the values it computes are credited to line, the line
+    of the outermost loop being run.  steps is a one-element list
+    counting the iterations done so far.  We give up with NotStatic past BUDGET iterations, or
+    when a value turns out not to be known after all.
+    """
+    while True:
+        cond = fold(stmt["expr"], env)
+        if cond is None:
+            raise NotStatic()
+        if not cond:
+            return
+        steps[0] += 1
+        if steps[0] > BUDGET:
+            raise NotStatic()
+        for body_stmt in stmt["body"]:
+            if body_stmt["nodetype"] == AST_WHILE:
+                run_loop(body_stmt, env, steps, line)
+            else:
+                v = fold(body_stmt["rhs"], env)
+                if v is None:
+                    raise NotStatic()
+                env[body_stmt["lhs"]] = (v, line)
+
+def partial_eval(ast, symtab):
+    """
+    Input : the typed AST and symbol table of a mini program
+    Output: an equivalent typed AST, and the number of statements and
+    loops that were eliminated
+
+    We walk the statements in order, keeping in env the value of every
+    variable that is known at compile time.  Assignments of known values
+    are dropped and uses of known variables become literals.  A while
+    loop whose variables are all known and that does no I/O is run here,
+    for at most BUDGET iterations, and disappears; its final values go
+    into env.  Any other loop stays: the known variables it assigns are
+    stored just before it, and only those it does not assign are folded
+    inside it.  Whatever depends on read is left for the program.
+
+    A stored value keeps the line of the assignment, or of the loop,
+    that computed it, so profiles of the folded program still count the
+    right source lines.
+    """
+    def materialize(names, env, out):
+        for name in sorted(names):
+            if name in env:
+                value, line = env.pop(name)
+                out.append(astnode(AST_ASSIGN, lhs=name, line=line,
+                                   rhs=literal(value, symtab[name])))
+
+    def eval_stmts(stmts, env):
+        out = []
+        for stmt in stmts:
+            if stmt["nodetype"] == AST_ASSIGN:
+                v = fold(stmt["rhs"], env)
+                if v is not None:
+                    env[stmt["lhs"]] = (v, stmt["line"])
+                else:
+                    out.append(astnode(AST_ASSIGN, lhs=stmt["lhs"], line=stmt["line"],
+                                       rhs=subst(stmt["rhs"], env)))
+                    env.pop(stmt["lhs"], None)
+            elif stmt["nodetype"] == AST_PRINT:
+                out.append(astnode(AST_PRINT, expr=subst(stmt["expr"], env), line=stmt["line"]))
+            elif stmt["nodetype"] == AST_READ:
+                env.pop(stmt["id"]["value"], None)
+                out.append(stmt)
+            elif stmt["nodetype"] == AST_WHILE:
+                if fold(stmt["expr"], env) == 0:
+                    continue
+                changed = assigned_vars(stmt["body"], set())
+                if not has_io(stmt["body"]):
+                    loop_env = dict(env)
+                    try:
+                        run_loop(stmt, loop_env, [0], stmt["line"])
+                        env.update(loop_env)
+                        continue
+                    except NotStatic:
+                        pass
+                materialize(changed, env, out)
+                body_env = dict(env)
+                body = eval_stmts(stmt["body"], body_env)
+                # The next iteration and the code after the loop read
+                # these from memory.
+                materialize(changed, body_env, body)
+                out.append(astnode(AST_WHILE, expr=subst(stmt["expr"], env),
+                                   body=body, line=stmt["line"]))
+        return out
+
+    stmts = eval_stmts(ast["stmts"], {})
+    before = count_stmts(ast["stmts"])
+    after = count_stmts(stmts)
+    stats = { "stmts": before[0] - after[0], "loops": before[1] - after[1] }
+    return { "decls": ast["decls"], "stmts": stmts }, stats
+
+def main():
+    src = sys.stdin.read()
+    ast = parse(lex(src))
+    symtab = build_symtab(ast)
+    folded, stats = partial_eval(typecheck(ast, symtab), symtab)
+    print("<------ Statements ------->")
+    for stmt in folded["stmts"]:
+        print(stmt)
+    print('\n')
+    print("%d loops and %d statements eliminated" % (stats["loops"], stats["stmts"]))
+
+if __name__ == "__main__":
+    main()
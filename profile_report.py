@@ -0,0 +1,76 @@
+import sys
+
+def error(msg):
+    print("Error: " + msg)
+    sys.exit(1)
+
+def read_profile(path):
+    """
+    Input : the path of a profile written by an instrumented program
+    Output: two dictionaries, mapping source lines to statement counts
+    and source lines to (loop entries, loop iterations, loop seconds)
+
+    Each line of the profile is one of
+        stmt <line> <count>
+        loop <line> <entries> <iterations> <seconds>
+    Counters that share a source line are added together.
+    """
+    stmts = {}
+    loops = {}
+    with open(path) as f:
+        for row in f:
+            fields = row.split()
+            if not fields:
+                continue
+            if fields[0] == "stmt":
+                line = int(fields[1])
+                stmts[line] = stmts.get(line, 0) + int(fields[2])
+            elif fields[0] == "loop":
+                line = int(fields[1])
+                entries, iters, secs = loops.get(line, (0, 0, 0.0))
+                loops[line] = (entries + int(fields[2]), iters + int(fields[3]),
+                               secs + float(fields[4]))
+            else:
+                error("bad profile line: %r" % row)
+    return stmts, loops
+
+def report(src, stmts, loops, top=5):
+    """
+    Print the source with the execution count of every line next to
+    it, followed by the hottest loops and statements.
+    """
+    lines = src.split("\n")
+    print("%10s %10s %10s %10s  %4s" % ("count", "entries", "iters", "secs", "line"))
+    for lineno, text in enumerate(lines, 1):
+        count = stmts.get(lineno, "")
+        entries, iters, secs = loops.get(lineno, ("", "", ""))
+        if secs != "":
+            secs = "%.6f" % secs
+        print("%10s %10s %10s %10s  %4d  %s" % (count, entries, iters, secs, lineno, text))
+
+    def source(lineno):
+        if lineno <= len(lines):
+            return lines[lineno - 1].strip()
+        return ""
+
+    print("\nHot loops")
+    hot = sorted(loops.items(), key=lambda item: (item[1][2], item[1][1]), reverse=True)
+    for lineno, (entries, iters, secs) in hot[:top]:
+        print("%10d iterations in %d entries %10.6fs  line %d: %s"
+              % (iters, entries, secs, lineno, source(lineno)))
+
+    print("\nHot statements")
+    hot = sorted(stmts.items(), key=lambda item: item[1], reverse=True)
+    for lineno, count in hot[:top]:
+        print("%10d executions  line %d: %s" % (count, lineno, source(lineno)))
+
+def main():
+    if len(sys.argv) < 2:
+        error("usage: profile_report.py prog.seal [seal.prof]")
+    with open(sys.argv[1]) as f:
+        src = f.read()
+    stmts, loops = read_profile(sys.argv[2] if len(sys.argv) > 2 else "seal.prof")
+    report(src, stmts, loops)
+
+if __name__ == "__main__":
+    main()
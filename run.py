@@ -0,0 +1,83 @@
+from token import lex
+from parser import parse
+from symbol_table import build_symtab
+from typecheck import typecheck
+from code_gen import codegen
+from profile_report import read_profile
+from interp import run
+from partial_eval import partial_eval, count_stmts
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+# Below this many statement executions in the profile, running the
+# program in-process is cheaper than compiling it with gcc first.
+INTERP_MAX_STMTS = 100000
+
+def error(msg):
+    print("Error: " + msg)
+    sys.exit(1)
+
+def choose_backend(pgo):
+    """
+    Return "interp" if the profile says the program is short enough to
+    run in-process, "gcc" otherwise.  Without a profile we cannot tell,
+    so we compile.
+    """
+    if pgo is None:
+        return "gcc"
+    stmt_counts = pgo[0]
+    if sum(stmt_counts.values()) < INTERP_MAX_STMTS:
+        return "interp"
+    return "gcc"
+
+def build(typed_ast, symtab, exe, pgo=None, cflags=(), profile=False):
+    """
+    Generate C for the typed AST and compile it to exe with gcc; with
+    profile=True, the program counts executions (see codegen()).
+    """
+    c_file = exe + ".c"
+    stdout = sys.stdout
+    with open(c_file, "w") as f:
+        sys.stdout = f
+        try:
+            codegen(typed_ast, symtab, profile=profile, pgo=pgo)
+        finally:
+            sys.stdout = stdout
+    if subprocess.call(["gcc"] + list(cflags) + [c_file, "-o", exe]) != 0:
+        error("gcc failed on %s" % c_file)
+
+def main():
+    """
+    python run.py prog.seal [seal.prof]
+
+    Compile and run a mini program.  With a profile, codegen uses it
+    and choose_backend() may decide to run the program in-process.
+    Programs that have no loop left after partial evaluation are always
+    run in-process.
+    """
+    if len(sys.argv) < 2:
+        error("usage: run.py prog.seal [seal.prof]")
+    with open(sys.argv[1]) as f:
+        src = f.read()
+    pgo = read_profile(sys.argv[2]) if len(sys.argv) > 2 else None
+    ast = parse(lex(src))
+    symtab = build_symtab(ast)
+    typed_ast, stats = partial_eval(typecheck(ast, symtab), symtab)
+
+    if choose_backend(pgo) == "interp" or count_stmts(typed_ast["stmts"])[1] == 0:
+        run(typed_ast, symtab)
+        return
+    tmpdir = tempfile.mkdtemp()
+    try:
+        exe = os.path.join(tmpdir, "prog")
+        build(typed_ast, symtab, exe, pgo)
+        sys.stdout.flush()
+        sys.exit(subprocess.call([exe]))
+    finally:
+        shutil.rmtree(tmpdir)
+
+if __name__ == "__main__":
+    main()
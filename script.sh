@@ -9,3 +9,14 @@ seal () {
         fi
     fi
 }
+
+sealprof () {
+    if [ -z "$1" ]; then
+        echo "none"
+    else
+        python2 code_gen.py --profile-timing < "$1" > prof.c
+        gcc prof.c -o prof.out
+        ./prof.out
+        python2 profile_report.py "$1" seal.prof
+    fi
+}
@@ -0,0 +1,388 @@
+from token import lex
+from parser import parse
+from symbol_table import build_symtab
+from typecheck import typecheck
+import struct
+import sys
+
+# Token types
+TOK_ID     = 1
+
+# AST nodes
+AST_DECL   = 0
+AST_ASSIGN = 1
+AST_PRINT  = 2
+AST_INT    = 3
+AST_FLOAT  = 4
+AST_ID     = 5
+AST_BINOP  = 6
+AST_WHILE  = 7
+AST_READ   = 8
+
+MAGIC   = b"SEAL"
+VERSION = 1
+
+# What a file holds, right after the version.  A typed AST has a
+# type on every expression.
+KIND_TOKENS    = 0
+KIND_AST       = 1
+KIND_TYPED_AST = 2
+
+TYPES = ["int", "float", None]
+OPS   = ["+", "-", "*", "/"]
+
+def error(msg):
+    print("Error: " + msg)
+    sys.exit(1)
+
+def write_varint(out, n):
+    """Append n >= 0 to out, 7 bits per byte, low bits first."""
+    while n >= 0x80:
+        out.append((n & 0x7f) | 0x80)
+        n >>= 7
+    out.append(n)
+
+def read_varint(buf, pos):
+    """Return the varint at buf[pos] and the position after it."""
+    n = 0
+    shift = 0
+    while True:
+        b = buf[pos]
+        pos += 1
+        n |= (b & 0x7f) << shift
+        if b < 0x80:
+            return n, pos
+        shift += 7
+
+class Pools:
+    """
+    The string table (identifiers and type names) and the literal pool
+    (ints and floats) of a file being written.  Both hand out indexes,
+    and store every distinct value once.
+    """
+    def __init__(self):
+        self.strings = []
+        self.string_ids = {}
+        self.literals = []
+        self.literal_ids = {}
+
+    def string(self, s):
+        if s not in self.string_ids:
+            self.string_ids[s] = len(self.strings)
+            self.strings.append(s)
+        return self.string_ids[s]
+
+    def literal(self, v):
+        # 1, 1.0 and -0.0, 0.0 are equal as dict keys: key floats on
+        # their bits and ints on their value.
+        if isinstance(v, float):
+            key = (float, struct.pack("<d", v))
+        else:
+            key = (int, v)
+        if key not in self.literal_ids:
+            self.literal_ids[key] = len(self.literals)
+            self.literals.append(v)
+        return self.literal_ids[key]
+
+    def write(self, out):
+        write_varint(out, len(self.strings))
+        for s in self.strings:
+            data = s.encode("utf-8")
+            write_varint(out, len(data))
+            out.extend(data)
+        write_varint(out, len(self.literals))
+        for v in self.literals:
+            if isinstance(v, float):
+                out.append(1)
+                out.extend(struct.pack("<d", v))
+            else:
+                # Zigzag, so small negative ints stay small.
+                out.append(0)
+                write_varint(out, v * 2 if v >= 0 else -v * 2 - 1)
+
+def read_pools(buf, pos):
+    """Return the string table, the literal pool and the position after them."""
+    n, pos = read_varint(buf, pos)
+    strings = []
+    for i in range(n):
+        size, pos = read_varint(buf, pos)
+        s = bytes(buf[pos:pos + size])
+        # Python 2 reads native strings, like lex() gives.
+        if not isinstance(s, str):
+            s = s.decode("utf-8")
+        strings.append(s)
+        pos += size
+    n, pos = read_varint(buf, pos)
+    literals = []
+    for i in range(n):
+        tag = buf[pos]
+        pos += 1
+        if tag == 1:
+            literals.append(struct.unpack_from("<d", buf, pos)[0])
+            pos += 8
+        else:
+            z, pos = read_varint(buf, pos)
+            literals.append(z >> 1 if not z & 1 else -((z + 1) >> 1))
+    return strings, literals, pos
+
+def header(kind):
+    out = bytearray(MAGIC)
+    out.append(VERSION)
+    out.append(kind)
+    return out
+
+def check_header(buf, kinds):
+    """
+    Return a view of buf, the kind of file it holds and the position
+    past its header, or stop on a bad file.  The view is a memoryview,
+    which does not copy buf; Python 2 memoryviews index as strings, so
+    there we fall back to a bytearray copy.
+    """
+    if sys.version_info[0] < 3:
+        buf = bytearray(buf)
+    else:
+        buf = memoryview(buf)
+    if len(buf) < 6:
+        error("truncated seal file")
+    if bytes(buf[:4]) != MAGIC:
+        error("not a seal file")
+    if buf[4] != VERSION:
+        error("unsupported seal file version %d" % buf[4])
+    if buf[5] not in kinds:
+        error("expected a %s file" % ("token" if KIND_TOKENS in kinds else "AST"))
+    return buf, buf[5], 6
+
+def check_end(buf, pos):
+    if pos != len(buf):
+        error("corrupt seal file: trailing data")
+
+def dump_tokens(toks):
+    """
+    Input : a list of tokens, as returned by lex()
+    Output: their binary encoding, as bytes
+
+    The file is the header, the pools, then for every token its type,
+    the distance to the line of the previous token and a reference to
+    its value: 0 for None, 2*i+1 for string i, 2*i+2 for literal i.
+    """
+    pools = Pools()
+    body = bytearray()
+    write_varint(body, len(toks))
+    line = 0
+    for t in toks:
+        write_varint(body, t["toktype"])
+        write_varint(body, t["line"] - line)
+        line = t["line"]
+        v = t["value"]
+        if v is None:
+            body.append(0)
+        elif isinstance(v, str):
+            write_varint(body, 2 * pools.string(v) + 1)
+        else:
+            write_varint(body, 2 * pools.literal(v) + 2)
+    out = header(KIND_TOKENS)
+    pools.write(out)
+    out.extend(body)
+    return bytes(out)
+
+def load_tokens(buf):
+    """
+    Input : the output of dump_tokens(), as any buffer (bytes, mmap...)
+    Output: the list of tokens
+
+    buf is read through a memoryview, without copying it.
+    """
+    buf, kind, pos = check_header(buf, (KIND_TOKENS,))
+    try:
+        toks, pos = read_tokens(buf, pos)
+    except (IndexError, struct.error, UnicodeDecodeError):
+        error("truncated or corrupt seal file")
+    check_end(buf, pos)
+    return toks
+
+def read_tokens(buf, pos):
+    strings, literals, pos = read_pools(buf, pos)
+    n, pos = read_varint(buf, pos)
+    toks = []
+    line = 0
+    for i in range(n):
+        # Nearly every field fits in one byte, read those inline.
+        ty = buf[pos]
+        if ty < 0x80:
+            pos += 1
+        else:
+            ty, pos = read_varint(buf, pos)
+        delta = buf[pos]
+        if delta < 0x80:
+            pos += 1
+        else:
+            delta, pos = read_varint(buf, pos)
+        line += delta
+        ref = buf[pos]
+        if ref < 0x80:
+            pos += 1
+        else:
+            ref, pos = read_varint(buf, pos)
+        if ref == 0:
+            v = None
+        elif ref & 1:
+            v = strings[ref >> 1]
+        else:
+            v = literals[(ref >> 1) - 1]
+        toks.append({ "toktype": ty, "value": v, "line": line })
+    return toks, pos
+
+def dump_ast(ast):
+    """
+    Input : an AST, typed or not, as returned by parse() or typecheck()
+    Output: its binary encoding, as bytes
+
+    After the header and the pools come the declarations (name, type)
+    and the statements.  Every node starts with its kind; statements
+    then have their line, expressions their type, and both their
+    fields, with names and literals as indexes into the pools.
+    The kind in the header says whether every expression has a type.
+    """
+    pools = Pools()
+    body = bytearray()
+    typed = [True]
+
+    def put_expr(expr):
+        write_varint(body, expr["nodetype"])
+        if "type" not in expr:
+            typed[0] = False
+        body.append(TYPES.index(expr.get("type")))
+        if expr["nodetype"] in (AST_INT, AST_FLOAT):
+            write_varint(body, pools.literal(expr["value"]))
+        elif expr["nodetype"] == AST_ID:
+            write_varint(body, pools.string(expr["name"]))
+        elif expr["nodetype"] == AST_BINOP:
+            body.append(OPS.index(expr["op"]))
+            put_expr(expr["lhs"])
+            put_expr(expr["rhs"])
+
+    def put_stmts(stmts):
+        write_varint(body, len(stmts))
+        for stmt in stmts:
+            write_varint(body, stmt["nodetype"])
+            write_varint(body, stmt["line"])
+            if stmt["nodetype"] == AST_ASSIGN:
+                write_varint(body, pools.string(stmt["lhs"]))
+                put_expr(stmt["rhs"])
+            elif stmt["nodetype"] == AST_PRINT:
+                put_expr(stmt["expr"])
+            elif stmt["nodetype"] == AST_READ:
+                write_varint(body, pools.string(stmt["id"]["value"]))
+                write_varint(body, stmt["id"]["line"])
+            elif stmt["nodetype"] == AST_WHILE:
+                put_expr(stmt["expr"])
+                put_stmts(stmt["body"])
+
+    write_varint(body, len(ast["decls"]))
+    for decl in ast["decls"]:
+        write_varint(body, pools.string(decl["id"]))
+        body.append(TYPES.index(decl["type"]))
+    put_stmts(ast["stmts"])
+    out = header(KIND_TYPED_AST if typed[0] else KIND_AST)
+    pools.write(out)
+    out.extend(body)
+    return bytes(out)
+
+def load_ast(buf, typed=False):
+    """
+    Input : the output of dump_ast(), as any buffer (bytes, mmap...),
+    and whether the AST must be typed
+    Output: the AST
+
+    buf is read through a memoryview, without copying it.  With
+    typed=True, an AST that was dumped without types, such as the output
+    of parse(), is rejected.
+    """
+    buf, kind, pos = check_header(buf, (KIND_AST, KIND_TYPED_AST))
+    if typed and kind != KIND_TYPED_AST:
+        error("expected a typed AST, not the output of parse()")
+    try:
+        ast, pos = read_ast(buf, pos)
+    except (IndexError, struct.error, UnicodeDecodeError):
+        error("truncated or corrupt seal file")
+    check_end(buf, pos)
+    return ast
+
+def read_ast(buf, pos):
+    strings, literals, pos = read_pools(buf, pos)
+    # The recursive readers below share the read position.
+    state = [pos]
+
+    def varint():
+        n, state[0] = read_varint(buf, state[0])
+        return n
+
+    def byte():
+        b = buf[state[0]]
+        state[0] += 1
+        return b
+
+    def get_expr():
+        nodetype = varint()
+        ty = TYPES[byte()]
+        if nodetype in (AST_INT, AST_FLOAT):
+            node = { "nodetype": nodetype, "value": literals[varint()] }
+        elif nodetype == AST_ID:
+            node = { "nodetype": nodetype, "name": strings[varint()] }
+        elif nodetype == AST_BINOP:
+            op = OPS[byte()]
+            lhs = get_expr()
+            node = { "nodetype": nodetype, "op": op, "lhs": lhs, "rhs": get_expr() }
+        else:
+            error("corrupt seal file: bad expression kind %d" % nodetype)
+        if ty is not None:
+            node["type"] = ty
+        return node
+
+    def get_stmts():
+        stmts = []
+        for i in range(varint()):
+            nodetype = varint()
+            line = varint()
+            if nodetype == AST_ASSIGN:
+                lhs = strings[varint()]
+                stmts.append({ "nodetype": nodetype, "lhs": lhs, "rhs": get_expr(), "line": line })
+            elif nodetype == AST_PRINT:
+                stmts.append({ "nodetype": nodetype, "expr": get_expr(), "line": line })
+            elif nodetype == AST_READ:
+                name = strings[varint()]
+                id = { "toktype": TOK_ID, "value": name, "line": varint() }
+                stmts.append({ "nodetype": nodetype, "id": id, "line": line })
+            elif nodetype == AST_WHILE:
+                e = get_expr()
+                stmts.append({ "nodetype": nodetype, "expr": e, "body": get_stmts(), "line": line })
+            else:
+                error("corrupt seal file: bad statement kind %d" % nodetype)
+        return stmts
+
+    decls = []
+    for i in range(varint()):
+        name = strings[varint()]
+        decls.append({ "nodetype": AST_DECL, "id": name, "type": TYPES[byte()] })
+    stmts = get_stmts()
+    return { "decls": decls, "stmts": stmts }, state[0]
+
+def main():
+    """
+    python serialize.py tokens < prog.seal > prog.tok
+    python serialize.py ast < prog.seal > prog.ast    (typed AST)
+    """
+    if len(sys.argv) < 2 or sys.argv[1] not in ("tokens", "ast"):
+        error("usage: serialize.py tokens|ast < prog.seal")
+    src = sys.stdin.read()
+    toks = lex(src)
+    if sys.argv[1] == "tokens":
+        data = dump_tokens(toks)
+    else:
+        ast = parse(toks)
+        data = dump_ast(typecheck(ast, build_symtab(ast)))
+    out = getattr(sys.stdout, "buffer", sys.stdout)
+    out.write(data)
+
+if __name__ == "__main__":
+    main()
@@ -27,29 +27,30 @@ def error(msg):
     print("Error: " + msg)
     sys.exit(1)
 
-def tok(ty, val):
-    return { "toktype": ty, "value": val }
+def tok(ty, val, line):
+    return { "toktype": ty, "value": val, "line": line }
 
 
 def lex(s):
     """
     Input : a string representing a mini program
     Output: a list of tokens
-    lex(s) will produce a sequence of tokens, which are dicts with two
-    bindings: the type of the token (as defined above) and a semantic
-    value.  The semantic value (also called lexeme) is a piece of
-    information associated with the token, such as the name of an
-    identifier or the value of an integer literal.  Some tokens, like
+    lex(s) will produce a sequence of tokens, which are dicts with three
+    bindings: the type of the token (as defined above), a semantic
+    value and the source line the token starts on.  The semantic value
+    (also called lexeme) is a piece of information associated with the
+    token, such as the name of an identifier or the value of an integer
+    literal.  Some tokens, like
     the plus symbol, do not have an associated semantic value.
     Example:
     x = x + dx;
     =>
-    { "toktype": TOK_ID   , "value": "x" }
-    { "toktype": TOK_EQ   , "value": None }
-    { "toktype": TOK_ID   , "value": "x" }
-    { "toktype": TOK_PLUS , "value": None }
-    { "toktype": TOK_ID   , "value": "dx" }
-    { "toktype": TOK_SEMI , "value": None }
+    { "toktype": TOK_ID   , "value": "x" , "line": 1 }
+    { "toktype": TOK_EQ   , "value": None, "line": 1 }
+    { "toktype": TOK_ID   , "value": "x" , "line": 1 }
+    { "toktype": TOK_PLUS , "value": None, "line": 1 }
+    { "toktype": TOK_ID   , "value": "dx", "line": 1 }
+    { "toktype": TOK_SEMI , "value": None, "line": 1 }
     alpha   ::= ['a'-'z'  'A'-'Z'  '_']
     digit   ::= ['0'-'9']
     alnum   ::= alpha | digit
@@ -59,38 +60,41 @@ def lex(s):
     ident   ::= alpha alnum*
     """
     i = 0
+    line = 1
     tokens = []
     while i < len(s):
         c = s[i]
 
         # Skip spaces
         if c.isspace():
-            pass
+            if c == "\n":
+                line += 1
 
         # Skip comments
         elif c == "#":
             while s[i] != "\n":
                 i += 1
+            line += 1
 
         # Operators and punctuation
         elif c == "=":
-            tokens.append(tok(TOK_EQ, None))
+            tokens.append(tok(TOK_EQ, None, line))
         elif c == "+":
-            tokens.append(tok(TOK_PLUS, None))
+            tokens.append(tok(TOK_PLUS, None, line))
         elif c == "-":
-            tokens.append(tok(TOK_MINUS, None))
+            tokens.append(tok(TOK_MINUS, None, line))
         elif c == "*":
-            tokens.append(tok(TOK_STAR, None))
+            tokens.append(tok(TOK_STAR, None, line))
         elif c == "/":
-            tokens.append(tok(TOK_SLASH, None))
+            tokens.append(tok(TOK_SLASH, None, line))
         elif c == "(":
-            tokens.append(tok(TOK_LPAREN, None))
+            tokens.append(tok(TOK_LPAREN, None, line))
         elif c == ")":
-            tokens.append(tok(TOK_RPAREN, None))
+            tokens.append(tok(TOK_RPAREN, None, line))
         elif c == ":":
-            tokens.append(tok(TOK_COLON, None))
+            tokens.append(tok(TOK_COLON, None, line))
         elif c == ";":
-            tokens.append(tok(TOK_SEMI, None))
+            tokens.append(tok(TOK_SEMI, None, line))
 
         # Integer and float literals
         elif c.isdigit():
@@ -104,9 +108,9 @@ def lex(s):
                 while s[i].isdigit():
                     num += s[i]
                     i += 1
-                tokens.append(tok(TOK_FLOAT, float(num)))
+                tokens.append(tok(TOK_FLOAT, float(num), line))
             else:
-                tokens.append(tok(TOK_INT, int(num)))
+                tokens.append(tok(TOK_INT, int(num), line))
             i -= 1 # Read one char too many, readjust.
 
         # Identifiers and keywords
@@ -117,21 +121,21 @@ def lex(s):
                 i += 1
             i -= 1 # Read one char too many, readjust.
             if ident == "print":
-                tokens.append(tok(TOK_PRINT, None))
+                tokens.append(tok(TOK_PRINT, None, line))
             elif ident == "read":
-                tokens.append(tok(TOK_READ, None))
+                tokens.append(tok(TOK_READ, None, line))
             elif ident == "var":
-                tokens.append(tok(TOK_VAR, None))
+                tokens.append(tok(TOK_VAR, None, line))
             elif ident == "while":
-                tokens.append(tok(TOK_WHILE, None))
+                tokens.append(tok(TOK_WHILE, None, line))
             elif ident == "do":
-                tokens.append(tok(TOK_DO, None))
+                tokens.append(tok(TOK_DO, None, line))
             elif ident == "done":
-                tokens.append(tok(TOK_DONE, None))
+                tokens.append(tok(TOK_DONE, None, line))
             elif ident in ("int", "float"):
-                tokens.append(tok(TOK_TYPE, ident))
+                tokens.append(tok(TOK_TYPE, ident, line))
             else:
-                tokens.append(tok(TOK_ID, ident))
+                tokens.append(tok(TOK_ID, ident, line))
         else:
             error("invalid character: %r" % c)
         i += 1
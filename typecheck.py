@@ -1,6 +1,7 @@
 from token import lex
 from parser import parse
 from symbol_table import build_symtab
+import multiprocessing
 import sys
 
 # Token types
@@ -42,25 +43,59 @@ def error(msg):
 def astnode(nodetype, **args):
     return dict(nodetype=nodetype, **args)
 
-def typecheck(ast, symtab):
+class TypeCheckError(Exception):
+    pass
+
+def raise_error(msg):
+    raise TypeCheckError(msg)
+
+def make_checker(symtab, report=error, diags=None):
+    """
+    Return a function that type checks one statement against symtab.
+    Every diagnostic goes through report(msg), and error() prints it
+    and exits.  To collect every diagnostic instead, pass raise_error()
+    and a diags list: each failing statement, nested or not, then adds
+    (line, message) to diags, becomes None, and checking goes on with
+    the next statement.
+    """
     def check_stmt(stmt):
+        if diags is None:
+            return check_one(stmt)
+        try:
+            return check_one(stmt)
+        except TypeCheckError as e:
+            diags.append((stmt["line"], str(e)))
+            return None
+
+    def check_one(stmt):
         if stmt["nodetype"] == AST_PRINT:
             typed_expr = check_expr(stmt["expr"])
-            return astnode(AST_PRINT, expr=typed_expr)
+            return astnode(AST_PRINT, expr=typed_expr, line=stmt["line"])
         elif stmt["nodetype"] == AST_READ:
-            return astnode(AST_READ, id=stmt["id"])
+            if stmt["id"]["value"] not in symtab:
+                report("undeclared variable: %s" % stmt["id"]["value"])
+            return astnode(AST_READ, id=stmt["id"], line=stmt["line"])
         elif stmt["nodetype"] == AST_ASSIGN:
+            if stmt["lhs"] not in symtab:
+                report("undeclared variable: %s" % stmt["lhs"])
             typed_rhs = check_expr(stmt["rhs"])
             if typed_rhs["type"] == symtab[stmt["lhs"]]:
-                return astnode(AST_ASSIGN, lhs=stmt["lhs"], rhs=typed_rhs)
+                return astnode(AST_ASSIGN, lhs=stmt["lhs"], rhs=typed_rhs, line=stmt["line"])
             else:
-                error("expected %s, got %s" % (symtab[stmt["lhs"]], typed_rhs["type"]))
+                report("expected %s, got %s" % (symtab[stmt["lhs"]], typed_rhs["type"]))
         elif stmt["nodetype"] == AST_WHILE:
-            typed_expr = check_expr(stmt["expr"])
-            if typed_expr["type"] != "int":
-                error("loop condition must be an int")
+            # A bad condition must not hide the errors of the body.
+            try:
+                typed_expr = check_expr(stmt["expr"])
+                if typed_expr["type"] != "int":
+                    report("loop condition must be an int")
+            except TypeCheckError as e:
+                if diags is None:
+                    raise
+                diags.append((stmt["line"], str(e)))
+                typed_expr = None
             typed_body = [check_stmt(body_stmt) for body_stmt in stmt["body"]]
-            return astnode(AST_WHILE, expr=typed_expr, body=typed_body)
+            return astnode(AST_WHILE, expr=typed_expr, body=typed_body, line=stmt["line"])
 
     def check_expr(expr):
         if expr["nodetype"] == AST_INT:
@@ -69,7 +104,7 @@ def typecheck(ast, symtab):
             return astnode(AST_FLOAT, value=expr["value"], type="float")
         elif expr["nodetype"] == AST_ID:
             if expr["name"] not in symtab:
-                error("undeclared variable: %s" % expr["name"])
+                report("undeclared variable: %s" % expr["name"])
             return astnode(AST_ID, name=expr["name"], type=symtab[expr["name"]])
         elif expr["nodetype"] == AST_BINOP:
             typed_e1 = check_expr(expr["lhs"])
@@ -77,20 +112,100 @@ def typecheck(ast, symtab):
             if typed_e1["type"] == typed_e2["type"]:
                 return astnode(AST_BINOP, op=expr["op"], lhs=typed_e1, rhs=typed_e2, type=typed_e1["type"])
             else:
-                error("operands must have the same type")
+                report("operands must have the same type")
 
+    return check_stmt
+
+def typecheck(ast, symtab):
+    check_stmt = make_checker(symtab)
     updated_stmts = []
     for stmt in ast["stmts"]:
         updated_stmts.append(check_stmt(stmt))
     return { "decls": ast["decls"], "stmts": updated_stmts }
 
+def check_shard(symtab, stmts):
+    """
+    Type check one shard of the top-level statements.  Returns the
+    typed statements and the diagnostics as (line, message) pairs.
+    """
+    diags = []
+    check_stmt = make_checker(symtab, raise_error, diags)
+    return [check_stmt(stmt) for stmt in stmts], diags
+
+def shard_worker(conn, symtab, stmts):
+    conn.send(check_shard(symtab, stmts))
+    conn.close()
+
+def typecheck_parallel(ast, symtab, jobs=None, force_procs=False):
+    """
+    Input : the AST of a mini program, its symbol table and the number
+    of worker processes
+    Output: the same typed AST as typecheck()
+
+    The top-level statements only depend on the symbol table, so we
+    cut them into one contiguous shard per worker and check the shards
+    in separate processes.  Each worker gets the symbol table once,
+    when it is started, and sends its typed shard back over a pipe; we
+    glue the shards back together in order.  A single shard is checked
+    in-process, unless force_procs is set.
+
+    We drive plain Processes rather than a multiprocessing.Pool because
+    the pool imports the standard tokenize module, which then picks up
+    our token.py instead of the standard one.
+
+    Unlike typecheck(), we do not stop at the first error: every failing
+    statement is reported with its source line, then we exit.
+    """
+    jobs = jobs or multiprocessing.cpu_count()
+    stmts = ast["stmts"]
+    size = max(1, -(-len(stmts) // jobs))
+    shards = [stmts[i:i + size] for i in range(0, len(stmts), size)]
+
+    if len(shards) <= 1 and not force_procs:
+        results = [check_shard(symtab, shard) for shard in shards]
+    else:
+        workers = []
+        for shard in shards:
+            recv_end, send_end = multiprocessing.Pipe(False)
+            proc = multiprocessing.Process(target=shard_worker,
+                                           args=(send_end, symtab, shard))
+            proc.start()
+            send_end.close()
+            workers.append((proc, recv_end))
+        # Receive before joining, a worker blocks until its pipe is drained.
+        results = []
+        for proc, recv_end in workers:
+            try:
+                results.append(recv_end.recv())
+            except EOFError:
+                proc.join()
+                for other, other_end in workers:
+                    other.terminate()
+                error("type check worker died (exit code %s)" % proc.exitcode)
+        for proc, recv_end in workers:
+            proc.join()
+
+    updated_stmts = []
+    diags = []
+    for typed_stmts, shard_diags in results:
+        updated_stmts.extend(typed_stmts)
+        diags.extend(shard_diags)
+    if diags:
+        for line, msg in diags:
+            print("Error: line %d: %s" % (line, msg))
+        sys.exit(1)
+    return { "decls": ast["decls"], "stmts": updated_stmts }
+
 def main():
     src = sys.stdin.read()
     toks = lex(src)
     #printToken(toks)                   # source -> tokens
     ast = parse(toks)
     sym = build_symtab(ast)
-    type_check = typecheck(ast,sym)
+    if len(sys.argv) > 2 and sys.argv[1] == "-j":
+        type_check = typecheck_parallel(ast, sym, int(sys.argv[2]))
+    else:
+        type_check = typecheck(ast,sym)
     print("<------ Statements ------->")
     print(type_check['stmts'])
 